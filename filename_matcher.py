@@ -1,9 +1,12 @@
 import PTN
 import os
+from functools import lru_cache
 from typing import List
 
 
+@lru_cache(maxsize=4096)
 def parse_fname(fn: str) -> dict:
+    """ parsed filename attributes. result is cached and shared - do not modify """
     return PTN.parse(os.path.basename(fn))
 
 # ------------------------------------------------------
@@ -15,20 +18,25 @@ class FilenameMatcher:
     def __init__(self):
         self._metric = AttribMatchMetric()
 
-    def calc_match_scores(self, fn1: str, fns2: List[str]) -> List[float]:
-        """ returns scores vector such that scores[i] = match_score(fn1, fns2[i]) """
-        a1 = parse_fname(fn1)
-        return [self._metric(a1, parse_fname(fn2)) for fn2 in fns2]
+    def prepare(self, fn: str) -> dict:
+        """ parsed attributes of filename fn, to match against multiple lists with get_best_match_ix_prepared() """
+        return parse_fname(fn)
 
     def get_best_match_ix(self, fn1: str, fns2: List[str]):
         """ index of best match to filename fn1 amongst list fn2
             if best match is below threshold, returns None
         """
-        scores = self.calc_match_scores(fn1, fns2)
-        max_score = max(scores)
-        if max_score < self._metric.thresh:
-            return None
-        return scores.index(max_score)
+        return self.get_best_match_ix_prepared(self.prepare(fn1), fns2)
+
+    def get_best_match_ix_prepared(self, a1: dict, fns2: List[str]):
+        """ same as get_best_match_ix(), with fn1 given as its prepared attributes, a1 = prepare(fn1) """
+        best_ix, best_score = None, self._metric.thresh
+        for ix, fn2 in enumerate(fns2):
+            # candidates that cannot beat the current best are not fully scored
+            score = self._metric.score_with_cutoff(a1, parse_fname(fn2), best_score)
+            if score > best_score or (best_ix is None and score == best_score):
+                best_ix, best_score = ix, score
+        return best_ix
 
 
 class AttribMatchMetric:
@@ -44,6 +52,11 @@ class AttribMatchMetric:
             'encoder': 1,
             'audio': .5
         }
+        # heaviest keys first, so that score_with_cutoff can stop as early as possible
+        self._metric_weights = dict(sorted(self._metric_weights.items(), key=lambda kv: -kv[1]))
+        # max score attainable from the i-th key onward
+        weights = list(self._metric_weights.values())
+        self._remaining_weights = [sum(weights[i:]) for i in range(len(weights))]
         self._thresh = 2
 
     @property
@@ -58,3 +71,17 @@ class AttribMatchMetric:
             else:
                 score += w * self._missing_key_factor
         return score
+
+    def score_with_cutoff(self, a1: dict, a2: dict, cutoff: float) -> float:
+        """ same as self(a1, a2), but stops once the score cannot reach cutoff.
+            in that case, returns an upper bound of the score, which is below cutoff.
+        """
+        score = 0
+        for i, (k, w) in enumerate(self._metric_weights.items()):
+            if score + self._remaining_weights[i] < cutoff:
+                return score + self._remaining_weights[i]
+            if k in a1 and k in a2:
+                score += w * float(a1[k] == a2[k])
+            else:
+                score += w * self._missing_key_factor
+        return score
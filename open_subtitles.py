@@ -1,8 +1,11 @@
 """ Wrapper for OpenSubtitles API """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
+import shutil
+import threading
 from dataclasses import dataclass
 
 # ------------------------------------------------------
@@ -24,6 +27,14 @@ class Credentials:
 
 
 CREDENTIALS_FILE = os.path.dirname(__file__) + "/credentials.json"
+REQUEST_TIMEOUT = 30  # seconds
+
+# ------------------------------------------------------
+
+
+class DownloadLimitError(Exception):
+    pass
+
 
 # ------------------------------------------------------
 
@@ -39,55 +50,114 @@ class OpenSubtitles:
         self.credentials = load_credentials() if credentials is None else credentials
         self.token = None
         self.remaining_downloads = None
+        self._pending_downloads = 0  # link requests in progress, not yet reflected in remaining_downloads
+        self._lock = threading.Lock()
+        self._session = _make_session()
+        self._session.headers.update({'api-key': self.credentials.api_key})
+        self._cdn_session = _make_session()
         if login:
             self.login()
 
     def login(self):
-        response = requests.post(
+        response = self._session.post(
             API_URL.LOGIN,
-            headers={'api-key': self.credentials.api_key, 'content-type': 'application/json'},
-            data=json.dumps({'username': self.credentials.username, 'password': self.credentials.password})
+            headers={'content-type': 'application/json'},
+            data=json.dumps({'username': self.credentials.username, 'password': self.credentials.password}),
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        self.token = response.json()['token']
-        try:
-            self.remaining_downloads = response.json()['user']['remaining_downloads']
-        except:
-            pass
+        with self._lock:
+            self.token = response.json()['token']
+            try:
+                self.remaining_downloads = response.json()['user']['remaining_downloads']
+            except:
+                pass
 
     def search(self, search_params: dict) -> dict:
         """ Search open subtitles DB """
-        response = requests.get(
+        response = self._session.get(
             API_URL.SEARCH,
-            headers={'api-key': self.credentials.api_key},
-            params=search_params
+            params=search_params,
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
         return response.json()['data']
 
-    def download_item(self, file_item: dict, dst_fname: str):
+    def download_item(self, file_item: dict, dst_fname: str) -> int:
         """
         Download subtitle file item
         Args:
             file_item: open-subtitles api file item
             dst_fname: path to save subtitles to
+        Returns:
+            size of downloaded file, in bytes. if 0, no file is saved.
         """
-        response = requests.post(
-            API_URL.DOWNLOAD,
-            headers={'api-key': self.credentials.api_key,
-                     'authorization': self.token,
-                     'content-type': 'application/json'},
-            data=json.dumps({'file_id': file_item['file_id']})
-        )
-        response.raise_for_status()
-        open(dst_fname, 'wb').write(requests.get(response.json()['link']).content)
+        return self.download_link(self.request_download_link(file_item), dst_fname)
 
-        self.remaining_downloads = response.json()['remaining']
+    def request_download_link(self, file_item: dict) -> str:
+        """ Get download link for subtitle file item. counts against the download quota.
+            raises DownloadLimitError if the quota is exhausted, counting link requests still in progress
+        """
+        with self._lock:
+            # reserve a download before requesting it, so that concurrent requests do not overrun the quota
+            if self.remaining_downloads is not None and self.remaining_downloads - self._pending_downloads <= 0:
+                raise DownloadLimitError("OpenSubtitles download limit reached")
+            self._pending_downloads += 1
+        remaining_downloads = None
+        try:
+            response = self._session.post(
+                API_URL.DOWNLOAD,
+                headers={'authorization': self.token, 'content-type': 'application/json'},
+                data=json.dumps({'file_id': file_item['file_id']}),
+                timeout=REQUEST_TIMEOUT
+            )
+            if response.status_code == 406:
+                remaining_downloads = 0
+                raise DownloadLimitError("OpenSubtitles download limit reached")
+            response.raise_for_status()
+            remaining_downloads = response.json()['remaining']
+            return response.json()['link']
+        finally:
+            with self._lock:
+                self._pending_downloads -= 1
+                if remaining_downloads is not None:
+                    self.remaining_downloads = remaining_downloads
+
+    def download_link(self, link: str, dst_fname: str) -> int:
+        """
+        Download subtitle file from a link returned by request_download_link(). does not count against the quota.
+        Returns:
+            size of downloaded file, in bytes. if 0, no file is saved.
+        """
+        with self._cdn_session.get(link, stream=True, timeout=REQUEST_TIMEOUT) as file_response:
+            file_response.raise_for_status()
+            file_response.raw.decode_content = True
+            # write to a temporary file, so that a failed transfer does not leave a truncated subtitle file
+            tmp_fname = dst_fname + ".part"
+            try:
+                with open(tmp_fname, 'wb') as fp:
+                    shutil.copyfileobj(file_response.raw, fp, length=64 * 1024)
+                    size = fp.tell()
+                if size > 0:
+                    os.replace(tmp_fname, dst_fname)
+            finally:
+                if os.path.exists(tmp_fname):
+                    os.remove(tmp_fname)
+        return size
 
 
 # ------------------------------------------------------
 
 
+def _make_session() -> requests.Session:
+    """ Session with pooled keep-alive connections """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
 def load_credentials() -> Credentials:
     """ Load credentials from credentials.json """
     assert os.path.isfile(CREDENTIALS_FILE), \
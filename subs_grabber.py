@@ -1,53 +1,166 @@
 import json
-import xml.etree.ElementTree as ET
 import os
 from pathlib import Path
-import glob
-from open_subtitles import OpenSubtitles
+import threading
+import time
+import random
+import re
+import sqlite3
+import requests
+from collections import defaultdict
+from functools import lru_cache
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from open_subtitles import OpenSubtitles, DownloadLimitError
 from filename_matcher import FilenameMatcher
-from typing import List, Tuple
+from typing import List, Tuple, Set, Optional, Dict, Iterable, Union
+
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
 
 # ------------------------------------------------------
 
 LANGAUGE_CODES_FILE = os.path.dirname(__file__) + "/resources/language_codes.json"
 DEFAULT_LANGUAGE = "en"
+MAX_WORKERS = 8
+MAX_CONCURRENT_REQUESTS = 4
+REQUESTS_PER_SECOND = 5
+TRANSIENT_HTTP_STATUS = (429, 500, 502, 503, 504)
+AUTH_HTTP_STATUS = (401, 403)
+NOTFOUND_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "subs-grab", "notfound.sqlite")
+NOTFOUND_CACHE_TTL = 7 * 24 * 3600  # seconds
+SUBTITLE_SUFFIX_RE = re.compile(r"\.([A-Za-z]{2})\.srt\Z")  # subtitle file suffix: .<lang>.srt
 
 
 class NfoTypeError(Exception):
     pass
 
 
+class LoginError(Exception):
+    pass
+
+
+class _RateLimiter:
+    """ Spaces calls to acquire() at least 1/rps seconds apart, across threads """
+
+    def __init__(self, rps: float):
+        self._min_interval = 1. / rps
+        self._next_call_ts = 0.
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_call_ts - now
+            self._next_call_ts = max(now, self._next_call_ts) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _NotFoundCache:
+    """ Persistent record of searches that found no subtitles, to avoid repeating them within ttl """
+
+    def __init__(self, path: str = NOTFOUND_CACHE_FILE, ttl: float = NOTFOUND_CACHE_TTL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS notfound "
+                               "(imdb_id TEXT, langs TEXT, ts REAL, PRIMARY KEY(imdb_id, langs))")
+
+    def contains(self, imdb_id: str, langs: str) -> bool:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT ts FROM notfound WHERE imdb_id = ? AND langs = ?",
+                                         (imdb_id, langs)).fetchone()
+        except sqlite3.Error:
+            # treated as a cache miss - the search is repeated
+            return False
+        return row is not None and time.time() - row[0] < self._ttl
+
+    def add(self, imdb_id: str, langs: str):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO notfound VALUES (?, ?, ?)",
+                                   (imdb_id, langs, time.time()))
+        except sqlite3.Error:
+            # cache is best-effort - a failed write only means the search is repeated next run
+            pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
 # ------------------------------------------------------
 
 
 class SubtitlesGrabber:
 
-    def __init__(self, languages: List[str] = None, get_all_langs: bool = False):
+    def __init__(self, languages: List[str] = None, get_all_langs: bool = False,
+                 max_concurrent: int = MAX_CONCURRENT_REQUESTS, rps: float = REQUESTS_PER_SECOND,
+                 use_cache: bool = True):
         """
         Args:
             languages: list of languages (2-letter codes)
             get_all_langs: get all languages in list, instead of by priority
+            max_concurrent: max number of concurrent OpenSubtitles API requests
+            rps: max rate of OpenSubtitles API requests, per second
+            use_cache: skip searches that found no subtitles in a recent run
         """
-        self.open_subtitles = OpenSubtitles(login=True)
+        self.open_subtitles = OpenSubtitles(login=False)  # searching needs no login; login on first download
+        self._login_lock = threading.Lock()
+        self._login_error = None
         self.languages = [DEFAULT_LANGUAGE] if languages is None else languages
         self._get_all_langs = get_all_langs
         self._supports_multi_cd = False
         self._filematcher = FilenameMatcher()
-
-        language_code2name = {item["alpha2"]: item["English"] for item in json.load(open(LANGAUGE_CODES_FILE, "r"))}
+        self._imdb_cache = {}
+        self._search_cache = {}
+        self._search_locks = {}
+        self._search_lock = threading.Lock()
+        self._fs_index = defaultdict(set)  # base filename -> suffixes of local files with that base
+        self._indexed_dirs = set()
+        self._fs_lock = threading.Lock()
+        self._downloads_exhausted = threading.Event()
+        self._api_sem = threading.BoundedSemaphore(max_concurrent)
+        self._rate_limiter = _RateLimiter(rps)
+
+        language_code2name = _language_code2name()
         self._language_names = []
         for language in self.languages:
             if language not in language_code2name:
                 raise ValueError("Unknown language code: " + language)
             self._language_names.append(language_code2name[language])
 
+        self._notfound_cache = None
+        if use_cache:
+            try:
+                self._notfound_cache = _NotFoundCache()
+            except (OSError, sqlite3.Error) as err:
+                print(f"Warning: could not open not-found cache ({err}). Running without it.")
+
+    def close(self):
+        """ release resources held by grabber """
+        if self._notfound_cache is not None:
+            self._notfound_cache.close()
+            self._notfound_cache = None
+
     @staticmethod
     def build_subtitle_filename(base_fname: str, lang: str) -> str:
         return f"{base_fname}.{lang}.srt"
 
     @property
     def has_downloads(self):
-        return self.open_subtitles.remaining_downloads is None or self.open_subtitles.remaining_downloads > 0
+        if self._downloads_exhausted.is_set():
+            return False
+        remaining_downloads = self.open_subtitles.remaining_downloads
+        if remaining_downloads is not None and remaining_downloads <= 0:
+            self._downloads_exhausted.set()
+            return False
+        return True
 
     @property
     def language_names(self):
@@ -58,39 +171,158 @@ class SubtitlesGrabber:
             Returns at most one item per language (the best match for each language, if any)
         """
         assert "languages" in search_params, "Subtitle languages must be specified"
-        search_params["imdb_id"] = _read_nfo(nfo_file, "imdbid")
-        search_results = self.search(search_params)
+        imdb_id = self._imdb_cache[nfo_file] if nfo_file in self._imdb_cache else _read_nfo(nfo_file, "imdbid")
+        search_results = self.search_imdb(imdb_id, search_params['languages'])
         if len(search_results) == 0:
             return []
+        # group usable items and their file names by language, in a single pass
+        items_by_lang = defaultdict(list)
+        fnames_by_lang = defaultdict(list)
+        for item in search_results:
+            files = item['attributes']['files']
+            if len(files) > 0 and files[0]['file_name'] is not None and (len(files) == 1 or self._supports_multi_cd):
+                items_by_lang[item['attributes']['language']].append(item)
+                fnames_by_lang[item['attributes']['language']].append(files[0]['file_name'])
         result = []
+        nfo_attribs = self._filematcher.prepare(nfo_file)
         for lang in search_params['languages']:
-            subtitle_fnames = [item['attributes']['files'][0]['file_name']
-                               for item in search_results if item['attributes']['language'] == lang]
-            if len(subtitle_fnames) == 0:
+            lang_items = items_by_lang.get(lang)
+            if not lang_items:
                 continue
-            result_ix = self._filematcher.get_best_match_ix(nfo_file, subtitle_fnames)
+            subtitle_fnames = fnames_by_lang[lang]
+            result_ix = self._filematcher.get_best_match_ix_prepared(nfo_attribs, subtitle_fnames)
             if result_ix is not None:
-                result.append(search_results[result_ix])
+                result.append(lang_items[result_ix])
         return result
 
-    def search(self, search_params: dict) -> List[dict]:
-        result = self.open_subtitles.search(search_params)
-        if not self._supports_multi_cd:
-            result = [r for r in result if len(r['attributes']['files']) == 1 and
-                      r['attributes']['files'][0]['file_name'] is not None]
-        return result
+    def cache_imdb_ids(self, nfo_files: List[str], executor: Executor) -> List[str]:
+        """ Read imdb ids of nfo files in parallel, and cache them for searching
+            Returns the nfo files to process: nfo files with an imdb id, and nfo files that could not be read,
+            which are left uncached for grab_subtitles_for_file to report as failed
+        """
+        read_results = list(executor.map(lambda nfo_file: _safe_read_nfo(nfo_file, "imdbid"), nfo_files))
+        nfo_files_to_process = []
+        for nfo_file, (imdb_id, error) in zip(nfo_files, read_results):
+            if isinstance(error, NfoTypeError):
+                # not a media nfo file
+                continue
+            if error is None:
+                self._imdb_cache[nfo_file] = imdb_id
+            nfo_files_to_process.append(nfo_file)
+        return nfo_files_to_process
+
+    def search_imdb(self, imdb_id: str, languages: List[str]) -> List[dict]:
+        """ Search subtitles by imdb id. Results are cached per (imdb id, languages), so
+            media files that share an imdb id and missing languages cost a single API call
+        """
+        key = (imdb_id, ",".join(sorted(languages)))
+        with self._search_lock:
+            key_lock = self._search_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._search_cache:
+                if self._notfound_cache is not None and self._notfound_cache.contains(*key):
+                    self._search_cache[key] = []
+                else:
+                    self._search_cache[key] = self.search({"imdb_id": imdb_id, "languages": key[1]})
+                    # only empty API results are recorded. results that are all multi-cd (filtered out later by
+                    # find_subtitles_for_nfo when unsupported) are not, so such media is searched again next run
+                    if len(self._search_cache[key]) == 0 and self._notfound_cache is not None:
+                        self._notfound_cache.add(*key)
+        return self._search_cache[key]
 
-    def find_existing_subtitles_for_file(self, fname: str) -> List[str]:
-        """ returns list of subtitle languages that exist (locally) for an nfo/media file """
-        base_fname = os.path.splitext(fname)[0]
-        existing_langs = []
-        for stfile in glob.glob(self.build_subtitle_filename(glob.escape(base_fname), lang="*")):
-            lang = stfile.replace(str(base_fname) + ".", "")[:2]
-            existing_langs.append(lang)
-        return existing_langs
+    def search(self, search_params: dict) -> List[dict]:
+        """ Search open subtitles DB. multi-cd items are filtered by the caller, if unsupported
+            a rejected api key is remembered, and raised as LoginError on all later searches and logins
+        """
+        if self._login_error is not None:
+            raise self._login_error
+        try:
+            return self._api_call(self.open_subtitles.search, search_params)
+        except requests.HTTPError as err:
+            if not _is_auth_error(err):
+                raise
+            with self._login_lock:
+                if self._login_error is None:
+                    self._login_error = LoginError(f"OpenSubtitles API key rejected: {err}")
+            raise self._login_error from err
+
+    def _ensure_login(self):
+        """ login to OpenSubtitles, if not logged in yet
+            a non-transient login failure is remembered, and raised as LoginError on all later calls
+        """
+        with self._login_lock:
+            if self._login_error is not None:
+                raise self._login_error
+            if self.open_subtitles.token is not None:
+                return
+            try:
+                self._api_call(self.open_subtitles.login)
+            except Exception as err:
+                if _is_transient_error(err):
+                    raise
+                self._login_error = LoginError(f"OpenSubtitles login failed: {err}")
+                raise self._login_error from err
+
+    def _api_call(self, fn, *args):
+        """ call OpenSubtitles API method, within the concurrency and rate limits.
+            transient failures (throttling, server errors) are retried
+        """
+        def limited_call():
+            with self._api_sem:
+                self._rate_limiter.acquire()
+                return fn(*args)
+        return _retry(limited_call)
+
+    def index_dir(self, dirname: str, fnames: Iterable[str] = None):
+        """ Add directory to the local files index
+        Args:
+            dirname: directory path
+            fnames: names of files in directory. default = list directory
+        """
+        if fnames is None:
+            with os.scandir(dirname if dirname else ".") as it:
+                fnames = [entry.name for entry in it if entry.is_file()]
+        index = _index_files(dirname, fnames)
+        with self._fs_lock:
+            for base_fname, suffixes in index.items():
+                self._fs_index[base_fname].update(suffixes)
+            self._indexed_dirs.add(dirname)
+
+    def get_file_suffixes(self, base_fname: str) -> Set[str]:
+        """ suffixes of local files that share base filename, e.g. {".nfo", ".mkv", ".en.srt"}
+            directories that were not indexed yet are listed on first access
+        """
+        dirname = os.path.dirname(base_fname)
+        if dirname not in self._indexed_dirs:
+            self.index_dir(dirname)
+        with self._fs_lock:
+            return set(self._fs_index.get(base_fname, ()))
+
+    def find_existing_subtitles_for_file(self, fname: str, base_fname: str = None) -> Set[str]:
+        """ returns set of subtitle languages that exist (locally) for an nfo/media file
+            base_fname: fname without extension. default = computed from fname
+        """
+        if base_fname is None:
+            base_fname = os.path.splitext(fname)[0]
+        suffixes = self.get_file_suffixes(base_fname)
+        matches = (SUBTITLE_SUFFIX_RE.match(suffix) for suffix in suffixes)
+        return {match.group(1).lower() for match in matches if match is not None}
+
+    def find_missing_languages(self, fname: str, base_fname: str = None) -> List[str]:
+        """ languages to grab subtitles in for an nfo/media file, ordered by priority
+            empty if file has all the subtitles it needs
+            base_fname: fname without extension. default = computed from fname
+        """
+        existing_langs = self.find_existing_subtitles_for_file(fname, base_fname=base_fname)
+        missing_langs = [lang for lang in self.languages if lang not in existing_langs]
+        if self.languages[0] not in missing_langs and not self._get_all_langs:
+            # some missing subtitles, but top priority subtitles exist
+            return []
+        return missing_langs
 
-    def grab_subtitles_for_file(self, fname: str) -> Tuple[str, str]:
+    def grab_subtitles_for_file(self, fname: str, base_fname: str = None) -> Tuple[str, str]:
         """ Find and download subtitles for video or nfo file
+        base_fname: fname without extension. default = computed from fname
         Returns one of the following (status, info) tuples:
         - Subtitles already exist locally:  ("exist", "")
         - No matching subtitles found:      ("notfound", "")
@@ -102,36 +334,49 @@ class SubtitlesGrabber:
         if not self.has_downloads:
             return "dllimit", ""
 
-        base_fname = os.path.splitext(fname)[0]
-        missing_langs = [lang for lang in self.languages if lang not in self.find_existing_subtitles_for_file(fname)]
+        if base_fname is None:
+            base_fname = os.path.splitext(fname)[0]
+        missing_langs = self.find_missing_languages(fname, base_fname=base_fname)
 
         if len(missing_langs) == 0:
-            # no missing subtitles
             return "exist", ""
 
-        if self.languages[0] not in missing_langs and not self._get_all_langs:
-            # some missing subtitles, but top priority subtitles exist
-            return "exist", ""
-
-        nfo_file = base_fname + ".nfo"
-        assert os.path.isfile(nfo_file), "No nfo file: " + str(nfo_file)
+        nfo_ext = next((suffix for suffix in self.get_file_suffixes(base_fname) if suffix.lower() == ".nfo"), None)
+        if nfo_ext is None:
+            # no nfo file to identify media by
+            return "notfound", ""
+        nfo_file = base_fname + nfo_ext
 
         subtitle_items = self.find_subtitles_for_nfo(nfo_file, {"languages": missing_langs})
 
         if len(subtitle_items) == 0:
             return "notfound", ""
 
+        self._ensure_login()
+        if not self.has_downloads:
+            # quota ran out while searching
+            return "dllimit", ""
+
         downloaded_languages = []
-        subtitle_languages = [subtitle_item['attributes']['language'] for subtitle_item in subtitle_items]
+        reached_limit = False
+        lang_to_item = {subtitle_item['attributes']['language']: subtitle_item for subtitle_item in subtitle_items}
         for language in self.languages:
-            if language not in subtitle_languages:
+            subtitle_item = lang_to_item.get(language)
+            if subtitle_item is None:
                 continue
             dst_stfile = self.build_subtitle_filename(base_fname, lang=language)
-            subtitle_files_item = subtitle_items[subtitle_languages.index(language)]['attributes']['files']
+            subtitle_files_item = subtitle_item['attributes']['files']
             if len(subtitle_files_item) > 1 and not self._supports_multi_cd:
                 raise ValueError("Unexpected format: multi-cd")
-            self.open_subtitles.download_item(subtitle_files_item[0], dst_stfile)
-            if os.path.isfile(dst_stfile):
+            # the link request counts against the quota, so a failed file fetch is retried with the same link
+            try:
+                link = self._api_call(self.open_subtitles.request_download_link, subtitle_files_item[0])
+            except DownloadLimitError:
+                reached_limit = True
+                break
+            if _retry(self.open_subtitles.download_link, link, dst_stfile) > 0:
+                with self._fs_lock:
+                    self._fs_index[base_fname].add(f".{language}.srt")
                 downloaded_languages.append(language)
                 if not self._get_all_langs:
                     break
@@ -139,60 +384,121 @@ class SubtitlesGrabber:
         if len(downloaded_languages) > 0:
             return "downloaded", ", ".join(downloaded_languages)
 
+        if reached_limit:
+            return "dllimit", ""
+
         return "failed", ""
 
 
 # ------------------------------------------------------
 
-def grab_subtitles(root_dir: str, langs: str):
-    """ Get subtitles for nfo files under root directory """
-
+def grab_subtitles(root_dirs: Union[str, List[str]], langs: str, max_workers: int = MAX_WORKERS,
+                   use_cache: bool = True):
+    """ Get subtitles for nfo files under root directories
+    Args:
+        root_dirs: root directory of media files, or list of root directories
+        langs: comma separated language codes, ordered by priority
+        max_workers: max number of media files processed concurrently
+        use_cache: skip searches that found no subtitles in a recent run
+    """
+
+    if isinstance(root_dirs, str):
+        root_dirs = [root_dirs]
     languages = [c.strip() for c in langs.split(",")]
-    print(f"\nGrabbing subtitles for media at " + root_dir)
 
-    nfo_files = glob.glob(os.path.join(root_dir, "**", "*.nfo"))
-    if len(nfo_files) == 0:
-        nfo_files = glob.glob(os.path.join(root_dir, "*.nfo"))
+    # single walk over each tree, to find nfo files and index directory listings
+    nfo_files = {}
+    dir_listings = {}
+    walked_dirs = set()  # real paths of walked directories
+    for root_dir in root_dirs:
+        print(f"\nGrabbing subtitles for media at " + root_dir)
+        root_nfo_files = []
+        root_walked = os.path.realpath(root_dir) in walked_dirs
+        for dirname, subdirnames, fnames in os.walk(os.path.normpath(root_dir), followlinks=True):
+            real_dirname = os.path.realpath(dirname)
+            if real_dirname in walked_dirs:
+                # already walked through another symlink or root. also stops symlink loops
+                subdirnames.clear()
+                continue
+            walked_dirs.add(real_dirname)
+            dir_listings[dirname] = fnames
+            root_nfo_files += [os.path.join(dirname, fname) for fname in fnames if fname.lower().endswith(".nfo")]
+        if len(root_nfo_files) == 0 and not root_walked:
+            print("No nfo files found under " + root_dir)
+        nfo_files.update(dict.fromkeys(root_nfo_files))  # ordered, without duplicates of overlapping roots
+    nfo_files = list(nfo_files)
     if len(nfo_files) == 0:
-        print("No nfo files found under " + root_dir)
         return
 
-    grabber = SubtitlesGrabber(languages=languages)
-    print("Languages: " + ", ".join(grabber.language_names))
-
-    stop_msg = ""
-    results = {"failed": [], "downloaded": [], "notfound": [], "exist": []}
-    for nfo_file in nfo_files:
-
-        if len(glob.glob(glob.escape(os.path.splitext(nfo_file)[0]) + ".*")) == 1:
-            # nfo file not associated with media file
-            continue
-
-        try:
-            status, info = grabber.grab_subtitles_for_file(nfo_file)
-            if status == "dllimit":
-                print("\nOpenSubtitles download limit reached. Try again later.")
-                stop_msg = " (reached limit)"
-                break
-        except NfoTypeError:
-            continue
-        except Exception as err:
-            status, info = "failed", "Error"
-
-        results[status].append(nfo_file)
-
-        if status == "exist":
-            msg = "Subtitles already exist"
-        elif status == "notfound":
-            msg = "Could not find subtitles"
-        elif status == "downloaded":
-            msg = "Downloaded subtitles"
-        elif status == "failed":
-            msg = "Failed download"
-        if len(info):
-            msg += " (" + info + ")"
-
-        print(f"{msg:30} - {os.path.splitext(nfo_file)[0]}")
+    grabber = SubtitlesGrabber(languages=languages, use_cache=use_cache)
+    try:
+        for dirname, fnames in dir_listings.items():
+            grabber.index_dir(dirname, fnames)
+        print("Languages: " + ", ".join(grabber.language_names))
+
+        stop_msg = ""
+        results = {"failed": [], "downloaded": [], "notfound": [], "exist": []}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            # nfo files were collected by their ".nfo" extension, so the base filename is a plain slice
+            base_fnames = {nfo_file: nfo_file[:-len(".nfo")] for nfo_file in nfo_files}
+
+            # skip nfo files not associated with media file
+            nfo_files = [nfo_file for nfo_file in nfo_files
+                         if len(grabber.get_file_suffixes(base_fnames[nfo_file])) > 1]
+
+            # read imdb ids only where subtitles are missing, and skip nfo files that have none
+            missing_nfo_files = [nfo_file for nfo_file in nfo_files
+                                 if len(grabber.find_missing_languages(nfo_file, base_fname=base_fnames[nfo_file])) > 0]
+            skipped_nfo_files = set(missing_nfo_files).difference(grabber.cache_imdb_ids(missing_nfo_files, executor))
+            nfo_files = [nfo_file for nfo_file in nfo_files if nfo_file not in skipped_nfo_files]
+
+            futures = {executor.submit(grabber.grab_subtitles_for_file, nfo_file, base_fnames[nfo_file]): nfo_file
+                       for nfo_file in nfo_files}
+
+            # results are consumed on the main thread, so printing and aggregation are serialized
+            for future in as_completed(futures):
+                nfo_file = futures[future]
+                if future.cancelled():
+                    continue
+
+                try:
+                    status, info = future.result()
+                except NfoTypeError:
+                    continue
+                except LoginError:
+                    # no download can succeed - stop the run with the login error
+                    for pending_future in futures:
+                        pending_future.cancel()
+                    raise
+                except Exception as err:
+                    status, info = "failed", "Error"
+
+                if status == "dllimit":
+                    if not stop_msg:
+                        print("\nOpenSubtitles download limit reached. Try again later.")
+                        stop_msg = " (reached limit)"
+                        # cancel pending files, but keep reporting files that are already in progress
+                        for pending_future in futures:
+                            pending_future.cancel()
+                    continue
+
+                results[status].append(nfo_file)
+
+                if status == "exist":
+                    msg = "Subtitles already exist"
+                elif status == "notfound":
+                    msg = "Could not find subtitles"
+                elif status == "downloaded":
+                    msg = "Downloaded subtitles"
+                elif status == "failed":
+                    msg = "Failed download"
+                if len(info):
+                    msg += " (" + info + ")"
+
+                print(f"{msg:30} - {base_fnames[nfo_file]}")
+    finally:
+        grabber.close()
 
     counts = {k: len(v) for k, v in results.items()}
     tot = counts["failed"] + counts["downloaded"] + counts["notfound"] + counts["exist"]
@@ -207,12 +513,75 @@ def grab_subtitles(root_dir: str, langs: str):
 # ------------------------------------------------------
 
 
-def _read_nfo(nfo_file: Path, key: str) -> str:
-    """ read key from nfo file """
-    tree = ET.parse(nfo_file)
-    root = tree.getroot()
-    item = root.find(key)
-    if item is None:
-        raise NfoTypeError(nfo_file)
-    return item.text
+def _retry(fn, *args, max_attempts: int = 3, base: float = 1., cap: float = 30.):
+    """ call fn(*args), retrying transient errors with exponential backoff """
+    for attempt in range(max_attempts):
+        try:
+            return fn(*args)
+        except Exception as err:
+            if attempt == max_attempts - 1 or not _is_transient_error(err):
+                raise
+        time.sleep(min(cap, base * 2 ** attempt) + random.uniform(0, .25))
+
+
+def _is_transient_error(err: Exception) -> bool:
+    """ is error a rate limit, server or connection error, worth retrying """
+    if isinstance(err, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return isinstance(err, requests.HTTPError) and err.response is not None \
+        and err.response.status_code in TRANSIENT_HTTP_STATUS
 
+
+def _is_auth_error(err: Exception) -> bool:
+    """ is error an authentication failure, e.g., invalid or revoked api key """
+    return isinstance(err, requests.HTTPError) and err.response is not None \
+        and err.response.status_code in AUTH_HTTP_STATUS
+
+
+@lru_cache(maxsize=1)
+def _language_code2name() -> dict:
+    """ mapping from 2-letter language code to English language name """
+    with open(LANGAUGE_CODES_FILE, "r") as fp:
+        return {item["alpha2"]: item["English"] for item in json.load(fp)}
+
+
+def _index_files(dirname: str, fnames: Iterable[str]) -> Dict[str, Set[str]]:
+    """ index files in directory as mapping: base filename -> suffixes of files with that base """
+    index = defaultdict(set)
+    for fname in fnames:
+        root, ext = os.path.splitext(os.path.join(dirname, fname))
+        index[root].add(ext)
+        if ext == ".srt":
+            # also index subtitle under media base: <base>.<lang>.srt
+            root, lang_ext = os.path.splitext(root)
+            index[root].add(lang_ext + ext)
+    return index
+
+
+def _read_nfo(nfo_file: Path, key: str) -> str:
+    """ read key from nfo file. results are cached until the nfo file is modified """
+    return _read_nfo_cached(nfo_file, os.stat(nfo_file).st_mtime_ns, key)
+
+
+@lru_cache(maxsize=4096)
+def _read_nfo_cached(nfo_file: Path, mtime_ns: int, key: str) -> str:
+    """ read key from nfo file. parsing stops at the first top-level element named key """
+    depth = 0
+    with open(nfo_file, "rb") as fp:
+        for event, elem in ET.iterparse(fp, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1 and elem.tag == key:
+                return elem.text
+            elem.clear()
+    raise NfoTypeError(nfo_file)
+
+
+def _safe_read_nfo(nfo_file: Path, key: str) -> Tuple[Optional[str], Optional[Exception]]:
+    """ read key from nfo file. returns (value, None), or (None, error) if reading failed """
+    try:
+        return _read_nfo(nfo_file, key), None
+    except (NfoTypeError, ET.ParseError, OSError) as err:
+        return None, err
@@ -11,6 +11,8 @@ Examples:
     > subsgrab.py D:\Media\TvShows es
     Grab subtitles in languages (by priority): English, Spanish, French:
     > subsgrab.py D:\Media\TvShows en,es,fr
+    Grab English subtitles for media under D:\Media\TvShows and D:\Media\Movies:
+    > subsgrab.py D:\Media\TvShows D:\Media\Movies en
 """
 
 parser = argparse.ArgumentParser(
@@ -18,9 +20,11 @@ parser = argparse.ArgumentParser(
     formatter_class=argparse.RawDescriptionHelpFormatter,
     description='Grab subtitles from opensubtitles.com')
 
-parser.add_argument('directory', type=str, help='Root directory of media files')
+parser.add_argument('directory', type=str, nargs='+', help='Root directory of media files. Or multiple directories.')
 parser.add_argument('language', type=str, help='Subtitle language as 2-letter code. Or multiple languages '
                                                'separated by commas, ordered by priority.')
+parser.add_argument('--no-cache', action='store_true', help='Search again for media whose subtitles were not '
+                                                             'found in a recent run.')
 
 
 # -------------------------------------------------------------
@@ -41,7 +45,7 @@ except:
 
 
 try:
-    grab_subtitles(args.directory, args.language)
+    grab_subtitles(args.directory, args.language, use_cache=not args.no_cache)
 except Exception as err:
     # execution failed
     print(err)